@@ -13,10 +13,33 @@ images are saved under the specified output directory.
 
 import argparse
 import csv
+import functools
+import heapq
+import json
+import multiprocessing
+import operator
+import os
+import queue
 import sys
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+FIELDNAMES = (
+    "image",
+    "label",
+    "confidence",
+    "x_min",
+    "y_min",
+    "x_max",
+    "y_max",
+    "width",
+    "height",
+)
 
 
 def _list_images(path: Path) -> List[Path]:
@@ -29,7 +52,23 @@ def _list_images(path: Path) -> List[Path]:
     if not path.exists():
         raise FileNotFoundError(f"Source path does not exist: {path}")
     image_exts = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
-    return sorted([p for p in path.rglob("*") if p.suffix.lower() in image_exts])
+    # Walk with os.scandir and match extensions on the raw names; Path objects
+    # are only built for the images that are returned.
+    found: List[str] = []
+    stack = [str(path)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    name = entry.name
+                    dot = name.rfind(".")
+                    if dot > 0 and name[dot:].lower() in image_exts and entry.is_file():
+                        found.append(entry.path)
+                    elif entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except PermissionError:
+            continue
+    return sorted(Path(p) for p in found)
 
 
 def _is_video(path: Path) -> bool:
@@ -37,29 +76,101 @@ def _is_video(path: Path) -> bool:
     return path.is_file() and path.suffix.lower() in video_exts
 
 
-def collect_detections(
-    source: Path,
-    model_name: str = "yolov8n.pt",
-    conf: float = 0.25,
+def _is_cuda(device: str) -> bool:
+    """True if `device` ("", "0", "cuda:1", "cpu", "mps:0", ...) selects a CUDA GPU."""
+    kind = device.strip().lower().split(":")[0]
+    if kind in ("cpu", "mps"):
+        return False
+    if kind:
+        return True
+    import torch  # type: ignore
+
+    return torch.cuda.is_available()
+
+
+def _use_half(half: Optional[bool], device: str) -> bool:
+    """Resolve the `half` option; None means FP16 on CUDA devices only."""
+    if half is not None:
+        return half
+    return _is_cuda(device)
+
+
+def _engine_fits(engine_path: Path, batch: int, imgsz: int = 640) -> bool:
+    """
+    Check the metadata Ultralytics writes at the start of an exported engine:
+    it must take `imgsz` x `imgsz` input and, being dynamic, up to `batch`
+    images (a static engine only fits a matching batch of 1, since the last
+    batch of a run may be short). Engines without metadata are not used.
+    """
+    try:
+        with engine_path.open("rb") as f:
+            size = int.from_bytes(f.read(4), byteorder="little", signed=True)
+            meta = json.loads(f.read(size).decode("utf-8"))
+    except (OSError, ValueError):
+        return False
+    if not isinstance(meta, dict):
+        return False
+    engine_imgsz = meta.get("imgsz")
+    if isinstance(engine_imgsz, int):
+        engine_imgsz = [engine_imgsz, engine_imgsz]
+    if list(engine_imgsz or []) != [imgsz, imgsz]:
+        return False
+    engine_batch = int(meta.get("batch") or 1)
+    if meta.get("args", {}).get("dynamic"):
+        return batch <= engine_batch
+    return batch == engine_batch == 1
+
+
+def _get_model(
+    model_name: str,
     device: str = "",
-    save_images: bool = False,
-    output_dir: Optional[Path] = None,
-) -> List[Dict[str, Any]]:
+    trt: bool = False,
+    batch: int = 16,
+    half: Optional[bool] = None,
+    int8: bool = False,
+) -> Any:
     """
-    Run YOLO on images from `source` and return structured detections.
+    Return a cached YOLO instance for (`model_name`, `device`).
 
-    Each detection row has keys:
-      - image: path to image
-      - label: class name
-      - confidence: float
-      - x_min, y_min, x_max, y_max: bounding box in pixels
-      - width, height: original image size
-    If `save_images` is True, annotated images are saved under `output_dir`.
+    Loading weights takes seconds, so the CLI and GUIs share one instance per
+    model/device pair; its predictor keeps the weights resident on `device`
+    after the first call.
+
+    On CUDA devices a TensorRT engine next to the weights (e.g. yolov8n.engine
+    for yolov8n.pt) is preferred when its metadata shows it takes `batch`
+    images of 640x640 (see `_engine_fits`). Otherwise, if `trt` is set, the
+    weights are exported to an engine first using `batch`, `half` and `int8`;
+    if not, the weights are used as is.
+    `half` also selects FP16 inference, which Ultralytics fixes when the
+    predictor is first set up, so it is part of the cache key.
     """
+    use_half = _use_half(half, device)
+    weights = Path(model_name)
+    if weights.suffix != ".engine" and _is_cuda(device):
+        engine_path = weights.with_suffix(".engine")
+        if engine_path.exists() and _engine_fits(engine_path, batch):
+            return _load_model(str(engine_path), device, False, 0, use_half, False)
+        if trt:
+            return _load_model(model_name, device, True, batch, use_half, int8)
+        if engine_path.exists():
+            print(
+                f"{engine_path} does not fit batch {batch} at 640x640; using {model_name} "
+                "(pass --trt to re-export it)",
+                file=sys.stderr,
+            )
+    elif trt and weights.suffix != ".engine":
+        print("TensorRT needs a CUDA device; using the weights as is", file=sys.stderr)
+    # Export-only options stay out of the cache key unless exporting, so every
+    # caller shares the same instance.
+    return _load_model(model_name, device, False, 0, use_half, False)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_model(model_name: str, device: str, trt: bool, batch: int, half: bool, int8: bool) -> Any:
     try:
         # Import only when needed, so basic CLI help works without deps
         from ultralytics import YOLO  # type: ignore
-    except Exception as exc:  # pragma: no cover - import/runtime environment issue
+    except Exception:  # pragma: no cover - import/runtime environment issue
         print(
             "Failed to import ultralytics. Did you install requirements?\n"
             "Try: pip install -r requirements.txt",
@@ -67,62 +178,497 @@ def collect_detections(
         )
         raise
 
-    if save_images and output_dir is not None:
-        output_dir.mkdir(parents=True, exist_ok=True)
+    if trt:
+        model_name = YOLO(model_name).export(
+            format="engine",
+            half=half,
+            int8=int8,
+            dynamic=True,
+            batch=batch,
+            device=device if device else None,
+        )
+
+    model = YOLO(model_name)
+    _warmup_model(model, device, half=half)
+    return model
+
+
+def _warmup_model(
+    model: Any,
+    device: str = "",
+    half: bool = False,
+    imgsz: int = 640,
+    runs: int = 2,
+) -> None:
+    """
+    Run a few dummy predictions so CUDA kernel selection and memory allocation
+    happen before the first real image. `_get_model` calls this once per
+    model loaded by `_load_model`.
+    """
+    import numpy as np  # type: ignore
+
+    dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for _ in range(runs):
+        model(dummy, device=device if device else None, half=half, verbose=False, save=False)
+
+
+def _letterbox_geometry(h: int, w: int, imgsz: int = 640) -> Tuple[int, int, int, int]:
+    """Return (new_h, new_w, top, left) for an h x w image, as Ultralytics' LetterBox computes them."""
+    r = min(imgsz / h, imgsz / w)
+    new_h, new_w = int(round(h * r)), int(round(w * r))
+    top = int(round((imgsz - new_h) / 2 - 0.1))
+    left = int(round((imgsz - new_w) / 2 - 0.1))
+    return new_h, new_w, top, left
+
+
+def _letterbox_image(img: Any, imgsz: int = 640, pad: bool = False) -> Any:
+    """
+    Resize an HWC uint8 BGR image to its letterbox scale; with `pad`, also
+    add the centered padding so the result is `imgsz` x `imgsz`.
+    """
+    import cv2  # type: ignore
+
+    h, w = img.shape[:2]
+    new_h, new_w, top, left = _letterbox_geometry(h, w, imgsz)
+    if (new_h, new_w) != (h, w):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    if pad:
+        img = cv2.copyMakeBorder(
+            img,
+            top,
+            imgsz - new_h - top,
+            left,
+            imgsz - new_w - left,
+            cv2.BORDER_CONSTANT,
+            value=(114, 114, 114),
+        )
+    return img
+
+
+class _ImageDataset:
+    """
+    Map-style dataset for a torch DataLoader: decodes an image and resizes it
+    to its letterbox scale in a worker process, so at most `imgsz` pixels a
+    side cross to the main process and the device. Padding and normalisation
+    happen on the model's device (see `_letterbox_on_device`); with `pad`
+    (for models not on CUDA) the workers pad too.
+
+    Items are (CHW uint8 BGR tensor, original (height, width)).
+    """
+
+    def __init__(self, images: Sequence[Path], imgsz: int = 640, pad: bool = False) -> None:
+        self.images = images
+        self.imgsz = imgsz
+        self.pad = pad
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def __getitem__(self, index: int) -> Tuple[Any, Tuple[int, int]]:
+        import torch  # type: ignore
+        from ultralytics.utils.patches import imread  # type: ignore
 
+        image_path = self.images[index]
+        img = imread(str(image_path))
+        if img is None:
+            raise FileNotFoundError(f"Could not read image: {image_path}")
+        orig_shape = img.shape[:2]
+        img = _letterbox_image(img, self.imgsz, pad=self.pad)
+        return torch.from_numpy(img).permute(2, 0, 1).contiguous(), orig_shape
+
+
+def _collate_images(items: List[Any]) -> Tuple[List[Any], List[Tuple[int, int]]]:
+    # Images differ in size, so a batch stays a list until it is letterboxed
+    tensors, orig_shapes = zip(*items)
+    return list(tensors), list(orig_shapes)
+
+
+def _prefetch_to_device(
+    loader: Iterable[Tuple[List[Any], Any]], device: Any
+) -> Iterator[Tuple[List[Any], Any]]:
+    """
+    Yield `loader` batches of (tensors, extra) with the tensors already moved
+    to `device`; `extra` is passed through as is. On CUDA the copy of the
+    next (pinned) batch is issued on a side stream before the current one is
+    returned, so host-to-device transfer overlaps with inference.
+    """
+    import torch  # type: ignore
+
+    if device.type != "cuda":
+        for tensors, extra in loader:
+            yield [t.to(device) for t in tensors], extra
+        return
+
+    copy_stream = torch.cuda.Stream(device)
+
+    def start_copy(item: Optional[Tuple[List[Any], Any]]) -> Optional[Tuple[List[Any], Any]]:
+        if item is None:
+            return None
+        tensors, extra = item
+        with torch.cuda.stream(copy_stream):
+            return [t.to(device, non_blocking=True) for t in tensors], extra
+
+    batches = iter(loader)
+    upcoming = start_copy(next(batches, None))
+    while upcoming is not None:
+        compute_stream = torch.cuda.current_stream(device)
+        compute_stream.wait_stream(copy_stream)
+        tensors, extra = upcoming
+        for t in tensors:
+            t.record_stream(compute_stream)
+        upcoming = start_copy(next(batches, None))
+        yield tensors, extra
+
+
+def _letterbox_on_device(
+    images: List[Any],
+    orig_shapes: Sequence[Tuple[int, int]],
+    imgsz: int = 640,
+    half: bool = False,
+) -> Any:
+    """
+    Pad CHW uint8 BGR images (already on the model's device) into one BCHW
+    RGB batch in [0, 1]. Images are normally at their letterbox scale (see
+    `_letterbox_image`); full-size ones are resized here and already padded
+    ones are copied as is. The geometry matches Ultralytics' LetterBox
+    (centered padding with value 114), so `_to_original` can invert it.
+    """
+    import torch  # type: ignore
+    import torch.nn.functional as F  # type: ignore
+
+    out = torch.full(
+        (len(images), 3, imgsz, imgsz),
+        114 / 255,
+        dtype=torch.float16 if half else torch.float32,
+        device=images[0].device,
+    )
+    for i, (img, (h, w)) in enumerate(zip(images, orig_shapes)):
+        new_h, new_w, top, left = _letterbox_geometry(h, w, imgsz)
+        x = img.flip(0).unsqueeze(0).float()  # BGR -> RGB
+        shape = tuple(img.shape[1:])
+        if shape == (imgsz, imgsz):  # padded already
+            new_h, new_w, top, left = imgsz, imgsz, 0, 0
+        elif shape != (new_h, new_w):
+            x = F.interpolate(x, size=(new_h, new_w), mode="bilinear", align_corners=False)
+        out[i, :, top:top + new_h, left:left + new_w] = x[0] / 255
+    return out
+
+
+def _plan_batches(images: Sequence[Path], batch: int, by_bytes: bool = False) -> List[List[int]]:
+    """
+    Split `images` into batches of at most `batch` indices.
+
+    By default batches are consecutive runs in listing order. With `by_bytes`,
+    files are taken largest first and each goes to the batch with the fewest
+    total bytes that still has room, so batches carry roughly equal decode
+    work and the biggest images are not left for the final batch.
+    """
+    n_batches = (len(images) + batch - 1) // batch
+    if not by_bytes or n_batches <= 1:
+        return [list(range(i, min(i + batch, len(images)))) for i in range(0, len(images), batch)]
+
+    sizes = []
+    for index, image_path in enumerate(images):
+        try:
+            sizes.append((os.stat(image_path).st_size, index))
+        except OSError:
+            sizes.append((0, index))
+    sizes.sort(reverse=True)
+
+    # Min-heap of (total bytes, batch number) for batches with room left
+    plan: List[List[int]] = [[] for _ in range(n_batches)]
+    open_batches = [(0, b) for b in range(n_batches)]
+    for size, index in sizes:
+        total, b = heapq.heappop(open_batches)
+        plan[b].append(index)
+        if len(plan[b]) < batch:
+            heapq.heappush(open_batches, (total + size, b))
+    return plan
+
+
+def _default_workers() -> int:
+    # Half the cores, at least 2; a single core decodes in the main process
+    cpus = os.cpu_count() or 1
+    return 0 if cpus < 2 else max(2, cpus // 2)
+
+
+def _to_original(results: Any, input_shape: Tuple[int, int], orig_shape: Tuple[int, int]) -> None:
+    """Map `results` boxes from the letterboxed input back to the original image."""
+    from ultralytics.utils import ops  # type: ignore
+
+    results.orig_shape = orig_shape
+    if results.boxes is None:
+        return
+    import torch  # type: ignore
+
+    data = results.boxes.data.clone()
+    xyxy = ops.scale_boxes(input_shape, data[:, :4], orig_shape)
+    # Boxes clipped to the canvas edge rescale to just under the image edge in
+    # float; snap them back so the int cast matches path-based prediction.
+    h, w = orig_shape
+    limits = xyxy.new_tensor([w, h, w, h])
+    data[:, :4] = torch.where(xyxy > limits - 1e-3, limits, xyxy)
+    results.update(boxes=data)
+
+
+class _LabelMap(dict):
+    """Class id -> name; unknown ids fall back to the id as a string."""
+
+    def __missing__(self, key: int) -> str:
+        return str(key)
+
+
+def _save_annotated(results: Any, image_path: Path, save_path: Path) -> None:
+    """Draw `results` on the original image and write it to `save_path`."""
+    import cv2  # type: ignore
+    from ultralytics.utils.patches import imread, imwrite  # type: ignore
+
+    results.orig_img = imread(str(image_path))
+    params = [cv2.IMWRITE_JPEG_QUALITY, 90] if save_path.suffix.lower() in (".jpg", ".jpeg") else None
+    imwrite(str(save_path), results.plot(), params)
+
+
+@dataclass
+class ImageDetections:
+    """Detections for one image, stored as parallel columns."""
+
+    image: Path
+    width: int
+    height: int
+    labels: List[str]
+    scores: Any  # float32 array, shape (n,)
+    boxes: Any  # int32 array, shape (n, 4): x_min, y_min, x_max, y_max
+
+
+def iter_image_detections(
+    source: Path,
+    model_name: str = "yolov8n.pt",
+    conf: float = 0.25,
+    device: str = "",
+    save_images: bool = False,
+    output_dir: Optional[Path] = None,
+    batch: int = 16,
+    trt: bool = False,
+    half: Optional[bool] = None,
+    int8: bool = False,
+    workers: Optional[int] = None,
+    images: Optional[List[Path]] = None,
+    batch_by_bytes: bool = False,
+) -> Iterator[ImageDetections]:
+    """
+    Run YOLO on images from `source` and yield an `ImageDetections` for each
+    image with at least one detection, as each batch is processed.
+
+    If `save_images` is True, annotated images are saved under `output_dir` by
+    background threads while the next batch runs. Images are decoded by
+    `workers` DataLoader processes (default: half the CPU cores, none on a
+    single core), resized there and padded on the model's device (see
+    `_ImageDataset`), then sent to the model `batch` at a time.
+    `half` selects FP16 inference (default: on for CUDA devices); `trt`,
+    `half` and `int8` also control TensorRT export (see `_get_model`).
+    Pass `images` when `source` has already been listed to skip the walk.
+    With `batch_by_bytes`, batches are balanced by file size (see
+    `_plan_batches`) and detections come out in that order.
+    """
     # Only images are supported here
     if source.is_file() and _is_video(source):
         raise ValueError("collect_detections is for images only; use process_video for videos")
 
-    images = _list_images(source)
+    if images is None:
+        images = _list_images(source)
     if not images:
-        return []
+        return
 
-    model = YOLO(model_name)
-    rows: List[Dict[str, Any]] = []
+    save_dir = (output_dir if output_dir is not None else Path("runs/detect")) / "pred"
+    if save_images:
+        save_dir.mkdir(parents=True, exist_ok=True)
 
-    for image_path in images:
-        results_list = model(
-            str(image_path),
-            conf=conf,
-            device=device if device else None,
-            verbose=False,
-            save=bool(save_images),
-            project=str(output_dir) if output_dir is not None else None,
-            name="pred",
-            exist_ok=True,
-        )
+    import numpy as np  # type: ignore
+    import torch  # type: ignore
+    from torch.utils.data import DataLoader  # type: ignore
 
-        results = results_list[0]
-        names = results.names
-        boxes = results.boxes
-        height, width = results.orig_shape if hasattr(results, "orig_shape") else (0, 0)
+    batch = max(1, int(batch))
+    use_half = _use_half(half, device)
+    model = _get_model(model_name, device, trt=trt, batch=batch, half=use_half, int8=int8)
+    model_device = model.predictor.device
+    # Mixed precision only where FP16 was asked for and is supported
+    autocast = use_half and model_device.type == "cuda"
+    # Resolved once per run instead of per image/box in the loop below
+    label_of = _LabelMap(model.names).__getitem__
+    int32, float32 = np.int32, np.float32
 
-        if boxes is None or len(boxes) == 0:
-            continue
+    plan = _plan_batches(images, batch, by_bytes=batch_by_bytes)
+    n_batches = len(plan)
+    workers = _default_workers() if workers is None else max(0, int(workers))
+    loader = DataLoader(
+        _ImageDataset(images, pad=model_device.type != "cuda"),
+        batch_sampler=plan,
+        num_workers=min(workers, n_batches) if n_batches > 1 else 0,
+        collate_fn=_collate_images,
+        pin_memory=model_device.type == "cuda",
+    )
+    # Annotated images are drawn and written off-thread; at most a few batches
+    # of results are kept waiting so memory stays bounded.
+    saver = ThreadPoolExecutor(max_workers=4) if save_images else None
+    pending: Deque["Future[None]"] = deque()
+    try:
+        batches = _prefetch_to_device(loader, model_device)
+        for indices, (tensors, orig_shapes) in zip(plan, batches):
+            batch_paths = [images[i] for i in indices]
+            with torch.inference_mode(), torch.autocast("cuda", enabled=autocast):
+                batch_tensor = _letterbox_on_device(tensors, orig_shapes, half=use_half)
+                results_list = model(
+                    batch_tensor,
+                    conf=conf,
+                    device=device if device else None,
+                    half=use_half,
+                    verbose=False,
+                    save=False,
+                )
+                for orig_shape, results in zip(orig_shapes, results_list):
+                    _to_original(results, batch_tensor.shape[2:], orig_shape)
+
+            # One device->host copy, cast and label lookup for the whole batch;
+            # each image then takes a slice of the shared arrays
+            counts = [0 if r.boxes is None else len(r.boxes) for r in results_list]
+            if any(counts):
+                data = torch.cat([r.boxes.data for r in results_list if r.boxes is not None])
+                data = data.float().cpu().numpy()
+                batch_xyxy = data[:, :4].astype(int32)
+                batch_scores = data[:, 4].astype(float32)
+                batch_labels = list(map(label_of, data[:, 5].astype(int32).tolist()))
+            end = 0
+
+            for image_path, results, count in zip(batch_paths, results_list, counts):
+                if saver is not None:
+                    pending.append(
+                        saver.submit(_save_annotated, results.cpu(), image_path, save_dir / image_path.name)
+                    )
+                    while len(pending) > 2 * batch:
+                        pending.popleft().result()
+
+                if count == 0:
+                    continue
+
+                start_row, end = end, end + count
+                height, width = results.orig_shape
+                yield ImageDetections(
+                    image_path,
+                    int(width),
+                    int(height),
+                    batch_labels[start_row:end],
+                    batch_scores[start_row:end],
+                    batch_xyxy[start_row:end],
+                )
+
+        # Surface any save errors before reporting completion
+        while pending:
+            pending.popleft().result()
+    finally:
+        if saver is not None:
+            saver.shutdown(wait=True)
 
-        cls_list = boxes.cls.tolist()
-        conf_list = boxes.conf.tolist()
-        xyxy = boxes.xyxy.tolist()
-
-        for (cls_id, score, bb) in zip(cls_list, conf_list, xyxy):
-            x_min, y_min, x_max, y_max = [int(v) for v in bb]
-            label = names.get(int(cls_id), str(int(cls_id)))
-            rows.append(
-                {
-                    "image": str(image_path),
-                    "label": label,
-                    "confidence": float(score),
-                    "x_min": x_min,
-                    "y_min": y_min,
-                    "x_max": x_max,
-                    "y_max": y_max,
-                    "width": int(width),
-                    "height": int(height),
-                }
+
+def _to_rows(chunks: Iterable[ImageDetections]) -> Iterator[Dict[str, Any]]:
+    for chunk in chunks:
+        image = str(chunk.image)
+        width, height = chunk.width, chunk.height
+        yield from (
+            {
+                "image": image,
+                "label": label,
+                "confidence": score,
+                "x_min": x_min,
+                "y_min": y_min,
+                "x_max": x_max,
+                "y_max": y_max,
+                "width": width,
+                "height": height,
+            }
+            for label, score, (x_min, y_min, x_max, y_max) in zip(
+                chunk.labels, chunk.scores.tolist(), chunk.boxes.tolist()
             )
+        )
 
-    return rows
+
+def iter_detections(
+    source: Path,
+    model_name: str = "yolov8n.pt",
+    conf: float = 0.25,
+    device: str = "",
+    save_images: bool = False,
+    output_dir: Optional[Path] = None,
+    batch: int = 16,
+    trt: bool = False,
+    half: Optional[bool] = None,
+    int8: bool = False,
+    workers: Optional[int] = None,
+    images: Optional[List[Path]] = None,
+    batch_by_bytes: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run YOLO on images from `source` and yield structured detections as each
+    batch is processed (parameters as for `iter_image_detections`).
+
+    Each detection row has keys:
+      - image: path to image
+      - label: class name
+      - confidence: float
+      - x_min, y_min, x_max, y_max: bounding box in pixels
+      - width, height: original image size
+    """
+    yield from _to_rows(
+        iter_image_detections(
+            source=source,
+            model_name=model_name,
+            conf=conf,
+            device=device,
+            save_images=save_images,
+            output_dir=output_dir,
+            batch=batch,
+            trt=trt,
+            half=half,
+            int8=int8,
+            workers=workers,
+            images=images,
+            batch_by_bytes=batch_by_bytes,
+        )
+    )
+
+
+def collect_detections(
+    source: Path,
+    model_name: str = "yolov8n.pt",
+    conf: float = 0.25,
+    device: str = "",
+    save_images: bool = False,
+    output_dir: Optional[Path] = None,
+    batch: int = 16,
+    trt: bool = False,
+    half: Optional[bool] = None,
+    int8: bool = False,
+    workers: Optional[int] = None,
+    images: Optional[List[Path]] = None,
+    batch_by_bytes: bool = False,
+) -> List[Dict[str, Any]]:
+    """Run YOLO on images from `source` and return detections as a list (see `iter_detections`)."""
+    return list(
+        iter_detections(
+            source=source,
+            model_name=model_name,
+            conf=conf,
+            device=device,
+            save_images=save_images,
+            output_dir=output_dir,
+            batch=batch,
+            trt=trt,
+            half=half,
+            int8=int8,
+            workers=workers,
+            images=images,
+            batch_by_bytes=batch_by_bytes,
+        )
+    )
 
 
 def process_video(
@@ -131,60 +677,269 @@ def process_video(
     model_name: str = "yolov8n.pt",
     conf: float = 0.25,
     device: str = "",
+    half: Optional[bool] = None,
+    batch: int = 8,
 ) -> Path:
     """
     Run YOLO on a single video file and save annotated video under output_dir.
     Returns the directory where outputs are saved.
+
+    Frames are read with OpenCV `batch` at a time, stacked into one tensor
+    (pinned on CUDA), letterboxed and inferred together; the annotated
+    frames are written to <output_dir>/pred/<name>.mp4.
+    """
+    if not source.is_file():
+        raise FileNotFoundError(f"Video file not found: {source}")
+
+    import cv2  # type: ignore
+    import numpy as np  # type: ignore
+    import torch  # type: ignore
+
+    save_dir = output_dir / "pred"
+    save_dir.mkdir(parents=True, exist_ok=True)
+
+    batch = max(1, int(batch))
+    use_half = _use_half(half, device)
+    model = _get_model(model_name, device, half=use_half)
+    model_device = model.predictor.device
+    autocast = use_half and model_device.type == "cuda"
+
+    cap = cv2.VideoCapture(str(source))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {source}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    writer: Optional[Any] = None
+    # CUDA resizes whole frames on the device; elsewhere OpenCV letterboxes
+    # them here, as the image workers do
+    on_cuda = model_device.type == "cuda"
+
+    def read_batches() -> Iterator[Tuple[List[Any], List[Any]]]:
+        # One contiguous BHWC tensor per batch, so each copy is a single transfer
+        while True:
+            frames = []
+            while len(frames) < batch:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                frames.append(frame)
+            if not frames:
+                return
+            if on_cuda:
+                stacked = torch.from_numpy(np.stack(frames)).pin_memory()
+            else:
+                stacked = torch.from_numpy(np.stack([_letterbox_image(f, pad=True) for f in frames]))
+            yield [stacked], frames
+
+    try:
+        for (stacked,), frames in _prefetch_to_device(read_batches(), model_device):
+            orig_shapes = [frame.shape[:2] for frame in frames]
+            with torch.inference_mode(), torch.autocast("cuda", enabled=autocast):
+                batch_tensor = _letterbox_on_device(
+                    list(stacked.permute(0, 3, 1, 2)), orig_shapes, half=use_half
+                )
+                results_list = model(
+                    batch_tensor,
+                    conf=conf,
+                    device=device if device else None,
+                    half=use_half,
+                    verbose=False,
+                    save=False,
+                )
+                for orig_shape, results in zip(orig_shapes, results_list):
+                    _to_original(results, batch_tensor.shape[2:], orig_shape)
+
+            for frame, results in zip(frames, results_list):
+                results.orig_img = frame
+                annotated = results.plot()
+                if writer is None:
+                    height, width = annotated.shape[:2]
+                    writer = cv2.VideoWriter(
+                        str(save_dir / f"{source.stem}.mp4"),
+                        cv2.VideoWriter_fourcc(*"mp4v"),
+                        fps,
+                        (width, height),
+                    )
+                writer.write(annotated)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+
+    return save_dir
+
+
+def write_csv(detections: Iterable[Dict[str, Any]], csv_path: Path) -> None:
+    """Write detections to CSV at `csv_path`, one row at a time as they arrive."""
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    fieldnames = list(FIELDNAMES)
+    # Plain csv.writer over itemgetter tuples avoids DictWriter's per-row
+    # key checks; both run in C.
+    to_tuple = operator.itemgetter(*fieldnames)
+    with csv_path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(map(to_tuple, detections))
+
+
+def write_parquet(chunks: Iterable[ImageDetections], parquet_path: Path, row_group_size: int = 65536) -> None:
+    """
+    Write per-image detections to a zstd-compressed Parquet file at
+    `parquet_path`, with the same columns as the CSV. Columns are built
+    straight from the NumPy arrays and flushed every `row_group_size` rows.
+    Requires pyarrow.
     """
     try:
-        from ultralytics import YOLO  # type: ignore
-    except Exception:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except Exception:  # pragma: no cover - optional dependency
         print(
-            "Failed to import ultralytics. Did you install requirements?\n"
-            "Try: pip install -r requirements.txt",
+            "Parquet output needs pyarrow.\n"
+            "Try: pip install pyarrow",
             file=sys.stderr,
         )
         raise
+    import numpy as np  # type: ignore
 
-    if not source.is_file():
-        raise FileNotFoundError(f"Video file not found: {source}")
+    schema = pa.schema(
+        [("image", pa.string()), ("label", pa.string()), ("confidence", pa.float32())]
+        + [(name, pa.int32()) for name in FIELDNAMES[3:]]
+    )
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
 
-    output_dir.mkdir(parents=True, exist_ok=True)
+    pending: List[ImageDetections] = []
+    pending_rows = 0
 
-    model = YOLO(model_name)
-    _ = model(
-        str(source),
-        conf=conf,
-        device=device if device else None,
-        verbose=False,
-        save=True,
-        project=str(output_dir),
-        name="pred",
-        exist_ok=True,
-    )
+    def flush(writer: Any) -> None:
+        images: List[str] = []
+        labels: List[str] = []
+        for chunk in pending:
+            images.extend([str(chunk.image)] * len(chunk.labels))
+            labels.extend(chunk.labels)
+        boxes = np.concatenate([chunk.boxes for chunk in pending])
+        counts = [len(chunk.labels) for chunk in pending]
+        columns = [
+            pa.array(images, pa.string()),
+            pa.array(labels, pa.string()),
+            pa.array(np.concatenate([chunk.scores for chunk in pending]), pa.float32()),
+            *(pa.array(np.ascontiguousarray(boxes[:, i]), pa.int32()) for i in range(4)),
+            pa.array(np.repeat([chunk.width for chunk in pending], counts).astype(np.int32), pa.int32()),
+            pa.array(np.repeat([chunk.height for chunk in pending], counts).astype(np.int32), pa.int32()),
+        ]
+        writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        pending.clear()
 
-    return output_dir / "pred"
+    with pq.ParquetWriter(str(parquet_path), schema, compression="zstd") as writer:
+        for chunk in chunks:
+            pending.append(chunk)
+            pending_rows += len(chunk.labels)
+            if pending_rows >= row_group_size:
+                flush(writer)
+                pending_rows = 0
+        if pending:
+            flush(writer)
 
 
-def write_csv(detections: List[Dict[str, Any]], csv_path: Path) -> None:
-    """Write detections to CSV at `csv_path`."""
-    csv_path.parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = [
-        "image",
-        "label",
-        "confidence",
-        "x_min",
-        "y_min",
-        "x_max",
-        "y_max",
-        "width",
-        "height",
-    ]
-    with csv_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in detections:
-            writer.writerow(row)
+def _inference_server(jobs: Any, results: Any) -> None:
+    """
+    Job loop for `InferenceServer`, run in a subprocess so torch, ultralytics
+    and loaded models stay in memory between GUI runs.
+
+    Jobs are (kind, kwargs) tuples; None stops the loop, as does the parent
+    process exiting.
+    """
+    handlers = {"warmup": _get_model, "images": collect_detections, "video": process_video}
+    while True:
+        try:
+            job = jobs.get(timeout=1.0)
+        except queue.Empty:
+            parent = multiprocessing.parent_process()
+            if parent is not None and not parent.is_alive():
+                return
+            continue
+        if job is None:
+            return
+
+        kind, kwargs = job
+        try:
+            result = handlers[kind](**kwargs)
+        except Exception as exc:  # noqa: BLE001 - reported back to the GUI
+            if kind != "warmup":
+                results.put(("error", str(exc)))
+            continue
+        if kind != "warmup":
+            results.put(("ok", result))
+
+
+class InferenceServer:
+    """
+    Persistent detection subprocess shared by the GUIs.
+
+    Start it when the window opens and `warmup` the default model; `run` then
+    sends image or video jobs to the already-loaded process and blocks until
+    the result comes back. The process is restarted if it dies.
+    """
+
+    def __init__(self) -> None:
+        # spawn: never fork a process that already runs GUI threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process: Optional[Any] = None
+        self._jobs: Any = None
+        self._results: Any = None
+        self._running = False
+
+    def start(self) -> None:
+        if self._process is not None and self._process.is_alive():
+            return
+        self._jobs = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        # Not a daemon: DataLoader workers are child processes of the server
+        self._process = self._ctx.Process(
+            target=_inference_server,
+            args=(self._jobs, self._results),
+            name="yolo-inference",
+        )
+        self._process.start()
+
+    def warmup(self, model_name: str, device: str = "", half: Optional[bool] = None) -> None:
+        """Load `model_name` in the background; errors surface on the next `run`."""
+        self.start()
+        self._jobs.put(("warmup", {"model_name": model_name, "device": device, "half": half}))
+
+    def run(self, kind: str, **kwargs: Any) -> Any:
+        """
+        Run `collect_detections` (kind "images") or `process_video` (kind
+        "video") with `kwargs` in the server and return its result.
+        """
+        self.start()
+        # `close` may run on another thread meanwhile, so keep this job's own handles
+        process, jobs, results = self._process, self._jobs, self._results
+        self._running = True
+        try:
+            jobs.put((kind, kwargs))
+            while True:
+                try:
+                    status, result = results.get(timeout=1.0)
+                    break
+                except queue.Empty:
+                    if not process.is_alive():
+                        raise RuntimeError("Inference process exited unexpectedly")
+        finally:
+            self._running = False
+        if status == "error":
+            raise RuntimeError(result)
+        return result
+
+    def close(self) -> None:
+        """Stop the server. A job still running is cancelled; its `run` raises RuntimeError."""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if process.is_alive() and not self._running:
+            self._jobs.put(None)
+            process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=5)
 
 
 def run_detection(
@@ -194,6 +949,12 @@ def run_detection(
     conf: float = 0.25,
     device: str = "",
     csv_path: Optional[Path] = None,
+    batch: int = 16,
+    trt: bool = False,
+    half: Optional[bool] = None,
+    int8: bool = False,
+    workers: Optional[int] = None,
+    batch_by_bytes: bool = False,
 ) -> None:
     """
     CLI entry: run detection, save annotated images, print summary, optional CSV.
@@ -207,6 +968,8 @@ def run_detection(
             model_name=model_name,
             conf=conf,
             device=device,
+            half=half,
+            batch=batch,
         )
         dt = time.time() - t0
         print(f"Done in {dt:.2f}s. Annotated video saved under: {out_dir}")
@@ -223,26 +986,44 @@ def run_detection(
     print(f"Running detection on {total_images} image(s) using {model_name}…")
     t0 = time.time()
 
-    detections = collect_detections(
+    # Single pass: summarize each image while the CSV/Parquet (if any) is streamed out
+    # Keyed by the listed Path objects, so no per-detection path parsing and
+    # same-named images in different subfolders stay separate
+    by_image: Dict[Path, Dict[str, float]] = {}
+
+    def summarize(chunks: Iterable[ImageDetections]) -> Iterator[ImageDetections]:
+        for chunk in chunks:
+            best = by_image.setdefault(chunk.image, {})
+            for label, score in zip(chunk.labels, chunk.scores.tolist()):
+                best[label] = max(score, best.get(label, 0.0))
+            yield chunk
+
+    detections = iter_image_detections(
         source=source,
         model_name=model_name,
         conf=conf,
         device=device,
         save_images=True,
         output_dir=output_dir,
+        batch=batch,
+        trt=trt,
+        half=half,
+        int8=int8,
+        workers=workers,
+        images=images,
+        batch_by_bytes=batch_by_bytes,
     )
+    if csv_path is not None and csv_path.suffix.lower() == ".parquet":
+        write_parquet(summarize(detections), csv_path)
+    elif csv_path is not None:
+        write_csv(_to_rows(summarize(detections)), csv_path)
+    else:
+        for _ in summarize(detections):
+            pass
 
     # Print concise per-image summary
-    by_image: Dict[str, Dict[str, float]] = {}
-    for det in detections:
-        image_path = Path(det["image"]).name
-        label = det["label"]
-        score = float(det["confidence"])
-        best = by_image.setdefault(image_path, {})
-        best[label] = max(score, best.get(label, 0.0))
-
-    for idx, image_path in enumerate([p.name for p in images], start=1):
-        print(f"[{idx}/{total_images}] {image_path}")
+    for idx, image_path in enumerate(images, start=1):
+        print(f"[{idx}/{total_images}] {image_path.name}")
         best = by_image.get(image_path, {})
         if best:
             summary = ", ".join(
@@ -253,8 +1034,8 @@ def run_detection(
             print("  → No objects detected above threshold")
 
     if csv_path is not None:
-        write_csv(detections, csv_path)
-        print(f"CSV saved to: {csv_path}")
+        kind = "Parquet" if csv_path.suffix.lower() == ".parquet" else "CSV"
+        print(f"{kind} saved to: {csv_path}")
 
     dt = time.time() - t0
     print(f"Done in {dt:.2f}s. Outputs saved under: {output_dir / 'pred'}")
@@ -296,7 +1077,40 @@ def parse_args(argv: Iterable[str]) -> argparse.Namespace:
         "--csv",
         type=Path,
         default=None,
-        help="Optional CSV output path to write detections",
+        help="Optional CSV output path to write detections (.parquet writes Parquet)",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=16,
+        help="Number of images or video frames per inference batch (default: 16)",
+    )
+    parser.add_argument(
+        "--trt",
+        action="store_true",
+        help="Export the model to a TensorRT engine (NVIDIA GPUs) and use it",
+    )
+    parser.add_argument(
+        "--half",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Use FP16 inference (and TensorRT export). Default: on for CUDA devices",
+    )
+    parser.add_argument(
+        "--int8",
+        action="store_true",
+        help="Use INT8 precision for the TensorRT export",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Image decoding worker processes (default: half the CPU cores; 0 on a single core)",
+    )
+    parser.add_argument(
+        "--batch-by-bytes",
+        action="store_true",
+        help="Group images into batches of similar total file size, largest first",
     )
     return parser.parse_args(list(argv))
 
@@ -311,6 +1125,12 @@ def main(argv: Iterable[str]) -> int:
             conf=args.conf,
             device=args.device,
             csv_path=args.csv,
+            batch=args.batch,
+            trt=args.trt,
+            half=args.half,
+            int8=args.int8,
+            workers=args.workers,
+            batch_by_bytes=args.batch_by_bytes,
         )
     except FileNotFoundError as not_found_err:
         print(str(not_found_err), file=sys.stderr)
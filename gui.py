@@ -8,13 +8,15 @@ Simple Tkinter GUI for YOLO detections → CSV.
 - Run detection and save CSV (optionally save annotated images)
 """
 
+import multiprocessing
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox
+from collections import deque
 from pathlib import Path
-from typing import Optional
+from typing import Deque, Optional
 
-from detect import collect_detections, write_csv, process_video
+from detect import InferenceServer, write_csv
 
 
 class YoloGui(tk.Tk):
@@ -27,9 +29,21 @@ class YoloGui(tk.Tk):
         self.source_path: Optional[Path] = None
         self.csv_path: Optional[Path] = None
         self.output_dir: Path = Path("runs/detect")
+        # Log lines are buffered (from any thread) and flushed on the Tk
+        # thread every 100 ms in a single insert
+        self._log_buf: Deque[str] = deque()
+        self._run_thread: Optional[threading.Thread] = None
+        self._closing = False
 
         # Widgets
         self._build_widgets()
+        self.after(100, self._flush_log)
+
+        # Detection runs in a persistent subprocess that keeps the model loaded;
+        # start it and load the default model now so the first run is fast
+        self._server = InferenceServer()
+        self._server.warmup(self.var_model.get().strip() or "yolov8n.pt", self.var_device.get().strip())
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _build_widgets(self) -> None:
         pad = {"padx": 8, "pady": 6}
@@ -80,9 +94,26 @@ class YoloGui(tk.Tk):
         self.txt_log = tk.Text(self, height=10)
         self.txt_log.pack(expand=True, fill="both", **pad)
 
+    def _on_close(self) -> None:
+        # Cancel a running job first; the run thread then stops without
+        # touching the window, so it can be joined before it is destroyed
+        self._closing = True
+        self._server.close()
+        if self._run_thread is not None:
+            self._run_thread.join(timeout=5)
+        self.destroy()
+
     def _log(self, msg: str) -> None:
-        self.txt_log.insert("end", msg + "\n")
-        self.txt_log.see("end")
+        self._log_buf.append(msg + "\n")
+
+    def _flush_log(self) -> None:
+        lines = []
+        while self._log_buf:
+            lines.append(self._log_buf.popleft())
+        if lines:
+            self.txt_log.insert("end", "".join(lines))
+            self.txt_log.see("end")
+        self.after(100, self._flush_log)
 
     def _choose_file(self) -> None:
         path = filedialog.askopenfilename(
@@ -114,9 +145,9 @@ class YoloGui(tk.Tk):
             self.lbl_csv.config(text=str(self.csv_path))
 
     def _run_async(self) -> None:
-        thread = threading.Thread(target=self._run, daemon=True)
+        self._run_thread = threading.Thread(target=self._run, daemon=True)
         self.btn_run.config(state="disabled")
-        thread.start()
+        self._run_thread.start()
 
     def _run(self) -> None:
         try:
@@ -137,7 +168,8 @@ class YoloGui(tk.Tk):
             # Decide image(s) vs video by extension
             video_exts = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
             if self.source_path.is_file() and self.source_path.suffix.lower() in video_exts:
-                out_dir = process_video(
+                out_dir = self._server.run(
+                    "video",
                     source=self.source_path,
                     output_dir=self.output_dir,
                     model_name=model or "yolov8n.pt",
@@ -148,7 +180,8 @@ class YoloGui(tk.Tk):
                 messagebox.showinfo("Completed", f"Annotated video saved under: {out_dir}")
                 return
 
-            detections = collect_detections(
+            detections = self._server.run(
+                "images",
                 source=self.source_path,
                 model_name=model or "yolov8n.pt",
                 conf=conf,
@@ -172,12 +205,15 @@ class YoloGui(tk.Tk):
             self._log(f"CSV saved to: {self.csv_path}")
             messagebox.showinfo("Completed", f"CSV saved to: {self.csv_path}")
         except Exception as exc:
-            messagebox.showerror("Error", str(exc))
+            if not self._closing:
+                messagebox.showerror("Error", str(exc))
         finally:
-            self.btn_run.config(state="normal")
+            if not self._closing:
+                self.btn_run.config(state="normal")
 
 
 def main() -> None:
+    multiprocessing.freeze_support()  # DataLoader workers in frozen builds
     app = YoloGui()
     app.mainloop()
 
@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import multiprocessing
 import sys
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 
-from PyQt6.QtCore import QObject, pyqtSignal, QThread
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
 from PyQt6.QtWidgets import (
     QApplication,
     QCheckBox,
@@ -23,7 +24,7 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
-from detect import collect_detections, write_csv, process_video
+from detect import InferenceServer, write_csv
 
 
 @dataclass
@@ -33,6 +34,7 @@ class RunParams:
     confidence: float
     device: str
     save_images: bool
+    half: Optional[bool]
     output_dir: Path
     csv_path: Optional[Path]
 
@@ -42,9 +44,10 @@ class Worker(QObject):
     done = pyqtSignal(str)
     error = pyqtSignal(str)
 
-    def __init__(self, params: RunParams) -> None:
+    def __init__(self, params: RunParams, server: InferenceServer) -> None:
         super().__init__()
         self.params = params
+        self.server = server
 
     def run(self) -> None:
         try:
@@ -52,24 +55,28 @@ class Worker(QObject):
             self.log.emit(f"Running detection on: {p.source_path}")
             video_exts = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
             if p.source_path.is_file() and p.source_path.suffix.lower() in video_exts:
-                out_dir = process_video(
+                out_dir = self.server.run(
+                    "video",
                     source=p.source_path,
                     output_dir=p.output_dir,
                     model_name=p.model_name,
                     conf=p.confidence,
                     device=p.device,
+                    half=p.half,
                 )
                 msg = f"Annotated video saved under: {out_dir}"
                 self.log.emit(msg)
                 self.done.emit(msg)
                 return
 
-            detections = collect_detections(
+            detections = self.server.run(
+                "images",
                 source=p.source_path,
                 model_name=p.model_name,
                 conf=p.confidence,
                 device=p.device,
                 save_images=p.save_images,
+                half=p.half,
                 output_dir=p.output_dir,
             )
             self.log.emit(f"Detections: {len(detections)}")
@@ -125,6 +132,10 @@ class MainWindow(QMainWindow):
         grid.addWidget(QLabel("Device"), 0, 4)
         self.txt_device = QLineEdit("")
         grid.addWidget(self.txt_device, 0, 5)
+
+        self.chk_half = QCheckBox("FP16 on CUDA")
+        self.chk_half.setChecked(True)
+        grid.addWidget(self.chk_half, 0, 6)
         root_layout.addLayout(grid)
 
         # Outputs row
@@ -149,8 +160,32 @@ class MainWindow(QMainWindow):
         self.txt_log.setReadOnly(True)
         root_layout.addWidget(self.txt_log, 1)
 
+        # Log lines are buffered and appended every 100 ms in a single call
+        self._log_buf: List[str] = []
+        self._log_timer = QTimer(self)
+        self._log_timer.setInterval(100)
+        self._log_timer.timeout.connect(self.flush_log)
+        self._log_timer.start()
+
         self._thread: Optional[QThread] = None
         self._worker: Optional[Worker] = None
+        self._closing = False
+
+        # Detection runs in a persistent subprocess that keeps the model loaded;
+        # start it and load the default model now so the first run is fast
+        self._server = InferenceServer()
+        self._server.warmup(self.txt_model.text().strip() or "yolov8n.pt", self.txt_device.text().strip())
+
+    def closeEvent(self, event) -> None:  # noqa: N802 - Qt override
+        # Cancel a running job first; the worker then fails fast and its thread
+        # can be waited for before the window goes away. Its done/error ->
+        # quit connections are queued to this (blocked) thread, so quit here.
+        self._closing = True
+        self._server.close()
+        if self._thread is not None:
+            self._thread.quit()
+            self._thread.wait()
+        super().closeEvent(event)
 
     def choose_file(self) -> None:
         path, _ = QFileDialog.getOpenFileName(
@@ -176,14 +211,25 @@ class MainWindow(QMainWindow):
             self.lbl_csv.setText(path)
 
     def append_log(self, msg: str) -> None:
-        self.txt_log.append(msg)
+        self._log_buf.append(msg)
+
+    def flush_log(self) -> None:
+        if self._log_buf:
+            self.txt_log.append("\n".join(self._log_buf))
+            self._log_buf.clear()
 
     def on_done(self, msg: str) -> None:
+        if self._closing:
+            return
         self.append_log(msg)
+        self.flush_log()
         QMessageBox.information(self, "Completed", msg)
         self.btn_run.setEnabled(True)
 
     def on_error(self, msg: str) -> None:
+        if self._closing:
+            return
+        self.flush_log()
         QMessageBox.critical(self, "Error", msg)
         self.btn_run.setEnabled(True)
 
@@ -203,15 +249,17 @@ class MainWindow(QMainWindow):
             confidence=conf,
             device=self.txt_device.text().strip(),
             save_images=self.chk_save_images.isChecked(),
+            half=None if self.chk_half.isChecked() else False,
             output_dir=self.output_dir,
             csv_path=self.csv_path,
         )
 
         self.btn_run.setEnabled(False)
+        self._log_buf.clear()
         self.txt_log.clear()
 
         self._thread = QThread(self)
-        self._worker = Worker(params)
+        self._worker = Worker(params, self._server)
         self._worker.moveToThread(self._thread)
         self._thread.started.connect(self._worker.run)
         self._worker.log.connect(self.append_log)
@@ -219,12 +267,19 @@ class MainWindow(QMainWindow):
         self._worker.error.connect(self.on_error)
         self._worker.done.connect(self._thread.quit)
         self._worker.error.connect(self._thread.quit)
+        self._thread.finished.connect(self._on_thread_finished)
         self._thread.finished.connect(self._worker.deleteLater)
         self._thread.finished.connect(self._thread.deleteLater)
         self._thread.start()
 
+    def _on_thread_finished(self) -> None:
+        # Both objects are deleted next; drop the references first
+        self._thread = None
+        self._worker = None
+
 
 def main() -> int:
+    multiprocessing.freeze_support()  # DataLoader workers in frozen builds
     app = QApplication(sys.argv)
     win = MainWindow()
     win.show()